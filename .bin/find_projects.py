@@ -18,25 +18,531 @@ hyperfine -w 10 \
     'find ~/Documents -type d \( -name ".git" -o -name ".hg" \) -print0 | xargs -0 dirname'\
     "fd -u --type d '\.(git|hg)$' ~/Documents | xargs -n1 dirname"
 ```
+
+`find_projects_bench.py` reproduces that comparison on generated trees.
+
+On trees where the walk is bound by stat latency (NFS home dirs) rather than
+CPU, `--jobs N` spreads the `os.scandir` calls over N threads.
+
+`--index` keeps the directory tree under ~/.cache/find_projects/ and only
+rescans directories whose mtime changed since the last run, so a warm lookup is
+one stat per directory instead of one scandir.
+
+`--daemon` walks once, then keeps the result set current with inotify and
+answers over a Unix socket; plain invocations for the same PATH read from that
+socket when it is up instead of walking.
+
+Directories named like DEFAULT_EXCLUDES (build output, dependency caches) are
+never descended into; `--exclude GLOB` adds to that set. `-0` prints each
+repository NUL-terminated as soon as it is found, for `fzf --read0`.
 """
 
 
+import argparse
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
 import os
+import pickle
+import queue
+import re
+import selectors
+import signal
+import socket
+import struct
 import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 
+REPO_MARKERS = (".git", ".hg")
+DEFAULT_EXCLUDES = ("node_modules", "target", ".venv", ".cache")
+INDEX_DIR = Path.home() / ".cache" / "find_projects"
+# mtimes this close to the scan are not trusted: the directory could still
+# change within the same timestamp tick without its mtime moving.
+RACY_MTIME_NS = 2_000_000_000
+
+
+@dataclass(frozen=True)
+class WalkOptions:
+    """Which directories a walk is allowed to descend into."""
+
+    max_depth: int | None = None
+    exclude: tuple[str, ...] = DEFAULT_EXCLUDES
+
+    def __post_init__(self):
+        pattern = "|".join(fnmatch.translate(glob) for glob in self.exclude)
+        object.__setattr__(self, "_excluded", re.compile(pattern or "(?!)").match)
 
-def search_projects(path: Path):
+    def excluded(self, name: str) -> bool:
+        return self._excluded(name) is not None
+
+    def descends_below(self, depth: int) -> bool:
+        """True if children of a directory at `depth` should be visited."""
+        return self.max_depth is None or depth < self.max_depth
+
+
+def search_projects(path: Path, options: WalkOptions = WalkOptions()):
     for root, dirnames, _ in os.walk(path):
-        if not any(".git" == name or ".hg" == name for name in dirnames):
+        if any(name in REPO_MARKERS for name in dirnames):
+            dirnames.clear()
+            yield Path(root).relative_to(path)
             continue
-        dirnames.clear()
+        if options.max_depth is not None:
+            depth = len(Path(root).relative_to(path).parts)
+            if not options.descends_below(depth):
+                dirnames.clear()
+                continue
+        dirnames[:] = [name for name in dirnames if not options.excluded(name)]
+
+
+def search_projects_parallel(
+    path: Path, jobs: int, options: WalkOptions = WalkOptions()
+):
+    """Same walk as `search_projects`, spread over `jobs` scandir workers.
+
+    Every directory found goes back on a shared queue, so whichever worker is
+    idle picks up the next one. Results come out in completion order.
+    """
+    todo: queue.Queue[tuple[str, int] | None] = queue.Queue()
+    found: queue.SimpleQueue[str | None] = queue.SimpleQueue()
+
+    def worker():
+        while (item := todo.get()) is not None:
+            root, depth = item
+            try:
+                subdirs = scan_dir(root, options)
+                if subdirs is None:
+                    found.put(root)
+                elif options.descends_below(depth):
+                    for subdir in subdirs:
+                        todo.put((subdir, depth + 1))
+            finally:
+                todo.task_done()
+
+    def supervisor():
+        todo.join()
+        for _ in workers:
+            todo.put(None)
+        found.put(None)
+
+    todo.put((str(path), 0))
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(jobs)]
+    for thread in workers:
+        thread.start()
+    threading.Thread(target=supervisor, daemon=True).start()
+
+    while (root := found.get()) is not None:
         yield Path(root).relative_to(path)
 
-try:
-    base = Path(sys.argv[1])
-except IndexError:
-    base = Path.cwd()
 
-for project in search_projects(base):
-    print(project)
+def scan_dir(root: str, options: WalkOptions) -> list[str] | None:
+    """List the directories to descend into, or None if `root` is a repository.
+
+    Mirrors `os.walk` defaults: unreadable directories are skipped and symlinked
+    directories count as children but are not followed. Excluded names are
+    dropped here; depth is left to the caller.
+    """
+    subdirs = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir():
+                        continue
+                    if entry.name in REPO_MARKERS:
+                        return None
+                    if not entry.is_symlink() and not options.excluded(entry.name):
+                        subdirs.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return subdirs
+
+
+class ProjectIndex:
+    """On-disk map of directory -> (mtime_ns, subdirs or None for a repo).
+
+    Each directory is stat'ed on every lookup, but only the ones whose mtime
+    moved are listed again: creating or removing a `.git`, or any entry, bumps
+    the mtime of the directory that holds it.
+    """
+
+    def __init__(self, base: Path, options: WalkOptions = WalkOptions()):
+        self.base = base.resolve()
+        self.options = options
+        self._path = state_file(self.base, options, ".pickle")
+        self._entries = self._read()
+        self._dirty = False
+
+    def _read(self) -> dict[str, tuple[int, list[str] | None]]:
+        try:
+            with open(self._path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return {}
+        if data.get("key") != self._key():
+            return {}
+        return data["entries"]
+
+    def _key(self):
+        return (str(self.base), self.options.max_depth, self.options.exclude)
+
+    def search(self):
+        """Yield repositories in `os.walk` order, refreshing stale entries."""
+        seen: dict[str, tuple[int, list[str] | None]] = {}
+        racy_after = time.time_ns() - RACY_MTIME_NS
+        stack = [(str(self.base), 0)]
+        while stack:
+            root, depth = stack.pop()
+            try:
+                mtime = os.stat(root).st_mtime_ns
+            except OSError:
+                self._dirty = True
+                continue
+            cached = self._entries.get(root)
+            if cached is not None and cached[0] == mtime:
+                subdirs = cached[1]
+            else:
+                subdirs = scan_dir(root, self.options)
+                self._dirty = True
+            seen[root] = (mtime if mtime < racy_after else -1, subdirs)
+            if subdirs is None:
+                yield Path(root).relative_to(self.base)
+            elif self.options.descends_below(depth):
+                stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
+        if len(seen) != len(self._entries):
+            self._dirty = True
+        self._entries = seen
+
+    def save(self):
+        if not self._dirty:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"key": self._key(), "entries": self._entries}
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self._path.parent, delete=False
+        ) as tmp:
+            pickle.dump(data, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp.name, self._path)
+        self._dirty = False
+
+
+class Inotify:
+    """Minimal ctypes binding over the Linux inotify syscalls."""
+
+    CREATE = 0x100
+    DELETE = 0x200
+    DELETE_SELF = 0x400
+    MOVE_SELF = 0x800
+    MOVED_FROM = 0x40
+    MOVED_TO = 0x80
+    Q_OVERFLOW = 0x4000
+    IGNORED = 0x8000
+    ONLYDIR = 0x1000000
+    ISDIR = 0x40000000
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self):
+        """Yield (wd, mask, name) for every queued event."""
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = self.EVENT.unpack_from(buffer, offset)
+            offset += self.EVENT.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ProjectWatcher:
+    """Live set of repositories beneath `base`, kept current by inotify.
+
+    Every directory the walk descends into is watched, plus each repository
+    root so removing its `.git`/`.hg` is noticed. Nothing inside a repository
+    is watched, so the watch count is bounded by the tree above the repos.
+    """
+
+    MASK = (
+        Inotify.CREATE
+        | Inotify.DELETE
+        | Inotify.MOVED_FROM
+        | Inotify.MOVED_TO
+        | Inotify.DELETE_SELF
+        | Inotify.MOVE_SELF
+        | Inotify.ONLYDIR
+    )
+
+    def __init__(self, base: Path, options: WalkOptions = WalkOptions()):
+        self.base = base.resolve()
+        self.options = options
+        self.inotify = Inotify()
+        self.repos: set[str] = set()
+        self._watches: dict[str, int] = {}
+        self._paths: dict[int, str] = {}
+        self._add_tree(str(self.base))
+
+    def projects(self) -> list[Path]:
+        return sorted(Path(repo).relative_to(self.base) for repo in self.repos)
+
+    def process_events(self):
+        for wd, mask, name in self.inotify.read():
+            if mask & Inotify.Q_OVERFLOW:
+                log("inotify queue overflowed, rescanning")
+                self._rescan()
+                return
+            if mask & Inotify.IGNORED:
+                path = self._paths.pop(wd, None)
+                if path is not None and self._watches.get(path) == wd:
+                    del self._watches[path]
+                continue
+            parent = self._paths.get(wd)
+            if parent is None or not name:
+                continue
+            path = os.path.join(parent, name)
+            if mask & (Inotify.CREATE | Inotify.MOVED_TO):
+                self._on_created(parent, path, name, mask)
+            elif mask & (Inotify.DELETE | Inotify.MOVED_FROM):
+                self._on_deleted(parent, path, name)
+
+    def _on_created(self, parent: str, path: str, name: str, mask: int):
+        if parent in self.repos:
+            return
+        if name in REPO_MARKERS:
+            if os.path.isdir(path):
+                self._drop_tree(parent, keep_root=True)
+                self.repos.add(parent)
+        elif mask & Inotify.ISDIR and not self.options.excluded(name):
+            self._add_tree(path)
+
+    def _on_deleted(self, parent: str, path: str, name: str):
+        if name in REPO_MARKERS:
+            if parent in self.repos and scan_dir(parent, self.options) is not None:
+                self.repos.discard(parent)
+                self._add_tree(parent)
+        elif parent not in self.repos:
+            self._drop_tree(path)
+
+    def _add_tree(self, top: str):
+        depth = len(Path(top).relative_to(self.base).parts)
+        if depth > 0 and not self.options.descends_below(depth - 1):
+            return
+        stack = [(top, depth)]
+        while stack:
+            root, depth = stack.pop()
+            # Watch before listing so entries created meanwhile still raise events.
+            self._watch(root)
+            subdirs = scan_dir(root, self.options)
+            if subdirs is None:
+                self.repos.add(root)
+            elif self.options.descends_below(depth):
+                stack.extend((subdir, depth + 1) for subdir in subdirs)
+
+    def _drop_tree(self, top: str, *, keep_root: bool = False):
+        prefix = top + os.sep
+        for path in [p for p in self._watches if p.startswith(prefix)]:
+            self._unwatch(path)
+        if not keep_root:
+            self._unwatch(top)
+            self.repos.discard(top)
+        self.repos = {repo for repo in self.repos if not repo.startswith(prefix)}
+
+    def _rescan(self):
+        for path in list(self._watches):
+            self._unwatch(path)
+        self.repos.clear()
+        self._add_tree(str(self.base))
+
+    def _watch(self, path: str):
+        try:
+            wd = self.inotify.add_watch(path, self.MASK)
+        except OSError as exc:
+            log(f"cannot watch {path}: {exc.strerror}")
+            return
+        self._watches[path] = wd
+        self._paths[wd] = path
+
+    def _unwatch(self, path: str):
+        wd = self._watches.pop(path, None)
+        if wd is not None:
+            self._paths.pop(wd, None)
+            self.inotify.rm_watch(wd)
+
+
+def serve(base: Path, options: WalkOptions) -> int:
+    """Run the watch daemon for `base` until interrupted."""
+    address = state_file(base.resolve(), options, ".sock")
+    if query_daemon(base, options) is not None:
+        log(f"a daemon is already serving {base}")
+        return 1
+    address.parent.mkdir(parents=True, exist_ok=True)
+    address.unlink(missing_ok=True)
+
+    watcher = ProjectWatcher(base, options)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(address))
+    server.listen()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    log(f"serving {len(watcher.repos)} repositories on {address}")
+
+    with selectors.DefaultSelector() as selector:
+        selector.register(watcher.inotify.fd, selectors.EVENT_READ, "inotify")
+        selector.register(server, selectors.EVENT_READ, "client")
+        try:
+            while True:
+                ready = {key.data for key, _ in selector.select()}
+                # Apply pending changes first so a query never sees stale data.
+                if "inotify" in ready:
+                    watcher.process_events()
+                if "client" in ready:
+                    conn, _ = server.accept()
+                    with conn:
+                        payload = "".join(f"{p}\0" for p in watcher.projects())
+                        conn.sendall(os.fsencode(payload))
+        finally:
+            server.close()
+            address.unlink(missing_ok=True)
+            watcher.inotify.close()
+
+
+def query_daemon(base: Path, options: WalkOptions) -> list[str] | None:
+    """Ask a running daemon for `base`'s repositories, None if there is none."""
+    address = state_file(base.resolve(), options, ".sock")
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(address))
+            chunks = []
+            while chunk := client.recv(64 * 1024):
+                chunks.append(chunk)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    return os.fsdecode(b"".join(chunks)).split("\0")[:-1]
+
+
+def state_file(base: Path, options: WalkOptions, suffix: str) -> Path:
+    """Per-PATH file under INDEX_DIR, keyed on the base directory and options."""
+    fields = [str(base), str(options.max_depth), *options.exclude]
+    key = hashlib.sha1("\0".join(fields).encode()).hexdigest()[:16]
+    return INDEX_DIR / f"{key}{suffix}"
+
+
+def log(message: str):
+    print(f"find_projects: {message}", file=sys.stderr)
+
+
+def main(args):
+    options = WalkOptions(max_depth=args.max_depth, exclude=args.exclude)
+    if args.daemon:
+        return serve(args.path, options)
+    end = "\0" if args.null else "\n"
+
+    def emit(projects):
+        for project in projects:
+            print(project, end=end, flush=args.null)
+
+    projects = query_daemon(args.path, options)
+    if projects is not None:
+        emit(projects)
+        return
+    if args.index:
+        index = ProjectIndex(args.path, options)
+        emit(index.search())
+        index.save()
+        return
+    if args.jobs > 1:
+        projects = search_projects_parallel(args.path, args.jobs, options)
+        # Streaming output keeps completion order rather than waiting to sort.
+        emit(projects if args.null else sorted(projects))
+    else:
+        emit(search_projects(args.path, options))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="List Git / Mercurial repositories beneath PATH"
+    )
+    parser.add_argument("path", nargs="?", type=Path, default=Path.cwd())
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="walk with N threads, 0 for one per CPU (default: 1)",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="reuse the on-disk index, rescanning only directories that changed",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="stay running, track changes with inotify and answer over a socket",
+    )
+    parser.add_argument(
+        "--max-depth",
+        "-d",
+        type=int,
+        metavar="N",
+        help="do not descend more than N directories below PATH",
+    )
+    parser.add_argument(
+        "--exclude",
+        "-E",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="skip directories whose name matches GLOB (repeatable), on top of "
+        + ", ".join(DEFAULT_EXCLUDES),
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        action="store_true",
+        help="descend into the default excluded directories too",
+    )
+    parser.add_argument(
+        "-0",
+        "--null",
+        action="store_true",
+        help="separate results with NUL and flush each one as soon as it is found",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        args.jobs = os.cpu_count() or 2
+    defaults = () if args.no_default_excludes else DEFAULT_EXCLUDES
+    args.exclude = (*defaults, *args.exclude)
+    return args
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(parse_args(sys.argv[1:])))
+    except KeyboardInterrupt:
+        print()
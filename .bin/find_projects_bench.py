@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+r"""Benchmark repository finders on synthetic directory trees.
+
+Builds trees of fixed shapes (wide, deep, many repos, few repos, huge
+node_modules) and times find_projects.py, find_projects.rs, `find` and `fd` on
+each one. Wall time comes from wait4(2). Peak RSS comes from GNU time
+(`time -f %M`): the RSS high-water mark survives fork and exec, so wait4 on a
+child of this harness would report the harness's own footprint for every tool.
+Without GNU time, RSS is left out. Syscall counts come from a separate
+`strace -c -f` run when strace is installed. Results go to JSON so runs on
+different machines can be compared.
+
+```sh
+find_projects_bench.py --runs 10 -o bench.json
+find_projects_bench.py --shapes wide deep --tools py py-jobs find
+```
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+HERE = Path(__file__).resolve().parent
+FIND_PROJECTS_PY = HERE / "find_projects.py"
+FIND_PROJECTS_RS = HERE / "find_projects.rs"
+# Trees are backdated by this much so find_projects.py --index does not treat
+# their fresh mtimes as racy (RACY_MTIME_NS) and rescan on every timed run.
+BACKDATE_SECONDS = 60
+STRACE_TOTAL = re.compile(
+    r"^[\d.]+\s+[\d.]+\s+\d+\s+(?P<calls>\d+)\s+(?:\d+\s+)?total$"
+)
+
+
+@dataclass(frozen=True)
+class Shape:
+    """Parameters of one synthetic tree; counts are multiplied by --scale."""
+
+    name: str
+    fanout: int
+    depth: int
+    repos: int
+    node_modules: int = 0
+
+    def scaled(self, factor: float) -> Shape:
+        return Shape(
+            name=self.name,
+            fanout=max(1, round(self.fanout * factor)),
+            depth=self.depth,
+            repos=max(1, round(self.repos * factor)),
+            node_modules=round(self.node_modules * factor),
+        )
+
+
+SHAPES = {
+    shape.name: shape
+    for shape in (
+        Shape("wide", fanout=5000, depth=1, repos=50),
+        Shape("deep", fanout=2, depth=12, repos=50),
+        Shape("many-repos", fanout=40, depth=2, repos=1500),
+        Shape("few-repos", fanout=25, depth=3, repos=5),
+        Shape("node-modules", fanout=20, depth=2, repos=20, node_modules=2000),
+    )
+}
+
+
+@dataclass(frozen=True)
+class Tool:
+    name: str
+    command: Callable[[Path], list[str]]
+    available: Callable[[], bool] = lambda: True
+
+
+def shell(script: str) -> Callable[[Path], list[str]]:
+    return lambda root: ["sh", "-c", script, "sh", str(root)]
+
+
+def fd_binary() -> str | None:
+    return shutil.which("fd") or shutil.which("fdfind")
+
+
+TOOLS = {
+    tool.name: tool
+    for tool in (
+        Tool("py", lambda root: [sys.executable, str(FIND_PROJECTS_PY), str(root)]),
+        Tool(
+            "py-jobs",
+            lambda root: [sys.executable, str(FIND_PROJECTS_PY), "-j", "0", str(root)],
+        ),
+        Tool(
+            "py-index",
+            # Keep the index next to the throwaway trees rather than in ~/.cache.
+            lambda root: [
+                "env",
+                f"HOME={root.parent}",
+                sys.executable,
+                str(FIND_PROJECTS_PY),
+                "--index",
+                str(root),
+            ],
+        ),
+        Tool(
+            "rs",
+            lambda root: [str(FIND_PROJECTS_RS), str(root)],
+            lambda: shutil.which("cargo") is not None,
+        ),
+        Tool(
+            "find",
+            shell(
+                r'find "$1" -type d \( -name .git -o -name .hg \) -print0'
+                " | xargs -0 -r dirname"
+            ),
+        ),
+        Tool(
+            "fd",
+            lambda root: [
+                "sh",
+                "-c",
+                r'"$0" -u --type d "\.(git|hg)$" "$1" | xargs -r -n1 dirname',
+                fd_binary() or "fd",
+                str(root),
+            ],
+            lambda: fd_binary() is not None,
+        ),
+    )
+}
+
+
+@dataclass
+class Result:
+    shape: str
+    tool: str
+    runs: int
+    repos_found: int
+    wall_seconds: dict[str, float]
+    max_rss_kib: int | None
+    syscalls: int | None
+    tree: dict[str, int] = field(default_factory=dict)
+
+
+def main(args: argparse.Namespace) -> int:
+    tools = [TOOLS[name] for name in args.tools]
+    for tool in tools:
+        if not tool.available():
+            print(f"skipping {tool.name}: not installed", file=sys.stderr)
+    tools = [tool for tool in tools if tool.available()]
+    strace = shutil.which("strace") if not args.no_strace else None
+    gnu_time = gnu_time_binary()
+    if gnu_time is None:
+        print("GNU time not found, not measuring peak RSS", file=sys.stderr)
+
+    results: list[Result] = []
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmp:
+        for name in args.shapes:
+            shape = SHAPES[name].scaled(args.scale)
+            root = Path(tmp) / shape.name
+            print(f"building {shape}", file=sys.stderr)
+            counts = build_tree(root, shape)
+            for tool in tools:
+                try:
+                    result = bench(tool, shape, root, args.runs, strace, gnu_time)
+                except subprocess.CalledProcessError as exc:
+                    print(f"skipping {tool.name}: {exc}", file=sys.stderr)
+                    continue
+                result.tree = counts
+                print(
+                    f"{shape.name:<14} {tool.name:<9}"
+                    f" median {result.wall_seconds['median'] * 1000:8.1f}ms"
+                    f"  rss {result.max_rss_kib or '-':>7}KiB"
+                    f"  repos {result.repos_found}",
+                    file=sys.stderr,
+                )
+                results.append(result)
+
+    report = {"machine": machine_info(), "results": [asdict(r) for r in results]}
+    with out_file(args.output) as out:
+        json.dump(report, out, indent=2)
+        out.write("\n")
+    return 0
+
+
+def build_tree(root: Path, shape: Shape) -> dict[str, int]:
+    """Create `shape` under `root`, returning how many directories it holds.
+
+    Plain directories form a `fanout`-ary tree `depth` levels deep; repositories
+    are spread over its leaves, each with a small `.git`. With `node_modules`
+    set, every repository also gets a plain sibling directory holding a
+    `node_modules` with that many packages, outside any repository so the
+    walkers have to prune it themselves.
+    """
+    leaves = [root]
+    directories = 0
+    for _ in range(shape.depth):
+        leaves = [leaf / f"d{i}" for leaf in leaves for i in range(shape.fanout)]
+        directories += len(leaves)
+    for leaf in leaves:
+        leaf.mkdir(parents=True, exist_ok=True)
+
+    for i in range(shape.repos):
+        repo = leaves[i * len(leaves) // shape.repos] / f"repo{i}"
+        for sub in ("objects/pack", "objects/info", "refs/heads", "refs/tags"):
+            (repo / ".git" / sub).mkdir(parents=True)
+        (repo / "src").mkdir()
+        # repo, .git, objects, objects/{pack,info}, refs, refs/{heads,tags}, src
+        directories += 9
+        if shape.node_modules:
+            modules = repo.with_name(f"web{i}") / "node_modules"
+            for j in range(shape.node_modules):
+                (modules / f"pkg{j}" / "lib").mkdir(parents=True)
+            # web, node_modules, then pkg and pkg/lib per package
+            directories += 2 + shape.node_modules * 2
+
+    past = time.time() - BACKDATE_SECONDS
+    for parent, _, _ in os.walk(root):
+        os.utime(parent, (past, past))
+    return {"directories": directories, "repos": shape.repos}
+
+
+def bench(
+    tool: Tool,
+    shape: Shape,
+    root: Path,
+    runs: int,
+    strace: str | None,
+    gnu_time: str | None,
+):
+    command = tool.command(root)
+    # Warm-up: fills the page cache, and the index for py-index.
+    found = len(run_once(command, gnu_time)[0].splitlines())
+    walls = []
+    rss_runs = []
+    for _ in range(runs):
+        _, wall, rss = run_once(command, gnu_time)
+        walls.append(wall)
+        if rss is not None:
+            rss_runs.append(rss)
+    return Result(
+        shape=shape.name,
+        tool=tool.name,
+        runs=runs,
+        repos_found=found,
+        wall_seconds={
+            "min": min(walls),
+            "median": statistics.median(walls),
+            "mean": statistics.fmean(walls),
+            "max": max(walls),
+        },
+        max_rss_kib=max(rss_runs, default=None),
+        syscalls=count_syscalls(strace, command) if strace else None,
+    )
+
+
+def run_once(
+    command: Sequence[str], gnu_time: str | None
+) -> tuple[str, float, int | None]:
+    """Run `command`, returning its stdout, wall time and peak RSS (KiB).
+
+    With `gnu_time` the command runs under it, so the RSS is that of a child
+    of the small `time` process rather than of this harness.
+    """
+    with tempfile.TemporaryFile() as stdout, tempfile.NamedTemporaryFile("r") as rss:
+        wrapped = list(command)
+        if gnu_time is not None:
+            wrapped = [gnu_time, "-f", "%M", "-o", rss.name, "--", *command]
+        start = time.perf_counter()
+        process = subprocess.Popen(wrapped, stdout=stdout, stderr=subprocess.DEVNULL)
+        _, status, _ = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command)
+        stdout.seek(0)
+        output = stdout.read().decode("utf8", "replace")
+        max_rss = int(rss.read().split()[-1]) if gnu_time is not None else None
+    return output, wall, max_rss
+
+
+def gnu_time_binary() -> str | None:
+    """GNU time, which reports a command's peak RSS with -f %M."""
+    path = shutil.which("time")
+    if path is None:
+        return None
+    try:
+        version = subprocess.run(
+            [path, "--version"], capture_output=True, text=True, check=False
+        )
+    except OSError:
+        return None
+    return path if "GNU" in version.stdout + version.stderr else None
+
+
+def count_syscalls(strace: str, command: Sequence[str]) -> int | None:
+    with tempfile.NamedTemporaryFile("r") as summary:
+        subprocess.run(
+            [strace, "-c", "-f", "-o", summary.name, *command],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        for line in summary:
+            if match := STRACE_TOTAL.match(line.strip()):
+                return int(match.group("calls"))
+    return None
+
+
+def machine_info() -> dict[str, str | int | None]:
+    return {
+        "hostname": platform.node(),
+        "system": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+
+@contextmanager
+def out_file(path: Path | None) -> Iterator[TextIO]:
+    if path is None:
+        yield sys.stdout
+        return
+    with open(path, "w") as out:
+        yield out
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--output", "-o", type=Path, help="JSON report (default: stdout)"
+    )
+    parser.add_argument("--runs", "-n", type=int, default=5, help="timed runs per tool")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply every shape's fanout and repo counts",
+    )
+    parser.add_argument(
+        "--shapes", nargs="+", choices=SHAPES, default=list(SHAPES), metavar="SHAPE"
+    )
+    parser.add_argument(
+        "--tools", nargs="+", choices=TOOLS, default=list(TOOLS), metavar="TOOL"
+    )
+    parser.add_argument(
+        "--tmpdir",
+        type=Path,
+        help="where to build the trees, e.g. an NFS mount (default: $TMPDIR)",
+    )
+    parser.add_argument(
+        "--no-strace", action="store_true", help="skip the syscall counting runs"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(parse_args(sys.argv[1:])))
+    except KeyboardInterrupt:
+        print()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 
 import argparse
+import hashlib
+import json
+import os
+import re
 import subprocess
 import sys
+import tempfile
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from pathlib import Path
 
 try:
     from tqdm import tqdm
@@ -20,30 +28,259 @@ except ImportError:
             report(i)
 
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+SHORTSTAT = re.compile(
+    r" (\d+) files? changed"
+    r"(?:, (\d+) insertions?\(\+\))?"
+    r"(?:, (\d+) deletions?\(-\))?"
+)
+COMMIT_MARKER = "\0"  # what %x00 expands to in --format
+CACHE_DIR = Path.home() / ".cache" / "git-report"
+COLUMNS = ("timestamp", "author", "files", "insertions", "deletions")
+DAY = 24 * 60 * 60
+WEEK = 7 * DAY
+EPOCH_TO_MONDAY = 3 * DAY  # 1970-01-01 was a Thursday
+
+
 def main(args):
+    if args.columnar or args.rollup:
+        return columnar_report(args)
     with out_file(args.output) as out:
-        print_csv(lambda s: print(s, file=out))
+        print_csv(
+            lambda s: print(s, file=out), args.per_author, args.jobs, args.no_cache
+        )
 
 
-def print_csv(printer: callable):
+def print_csv(printer: callable, per_author=False, jobs=1, no_cache=False):
     printer("files;insertions;deletions;author;branch")
-    for stats in collect_stats(git_authors()):
-        printer(stats)
+    if per_author:
+        stats = collect_stats(git_authors(), jobs)
+    else:
+        cache = None if no_cache else StatsCache()
+        stats = aggregate_stats(git_authors(), git_current_branch(), cache)
+    for line in stats:
+        printer(line)
 
 
 def check_output(command):
     return subprocess.check_output(command).decode("utf-8", "ignore")
 
 
-def collect_stats(authors):
-    for author in tqdm(authors):
+def collect_stats(authors, jobs=1):
+    """Run `git-insertions` per author, up to `jobs` at once, in author order."""
+
+    def author_stats(author):
         try:
-            yield check_output(("git-insertions", author)).strip()
+            return check_output(("git-insertions", author)).strip()
         except subprocess.CalledProcessError:
-            continue
+            return None
+
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        # Results are consumed in submission order, so output and progress
+        # advance deterministically however the subprocesses finish.
+        futures = [pool.submit(author_stats, author) for author in authors]
+        for future in tqdm(futures):
+            if (stats := future.result()) is not None:
+                yield stats
+    finally:
+        # On Ctrl-C or an error, drop the queued authors instead of waiting
+        # for every one of them to run.
+        pool.shutdown(cancel_futures=True)
     print("Done.", file=sys.stderr)
 
 
+def aggregate_stats(authors, branch, cache=None):
+    """Same rows as `collect_stats`, from a single `git log` over the branch.
+
+    Authors are keyed like `git-authors` prints them ("Name <email>", mailmap
+    applied), so each row matches what `git-insertions` reports for it. With a
+    cache, only the commits added since the previous run are read.
+    """
+    totals = {author: [0, 0, 0] for author in authors}
+    tip = git_rev_parse(branch)
+    revisions = tip
+    if cache is not None and (cached := cache.load(branch, tip)):
+        last_tip, cached_totals = cached
+        for author, counts in cached_totals.items():
+            totals[author] = list(counts)
+        revisions = None if last_tip == tip else f"{last_tip}..{tip}"
+    if revisions is not None:
+        print(f"Aggregating {revisions}...", file=sys.stderr)
+        for _, author, files, insertions, deletions in stream_shortstats(revisions):
+            total = totals.setdefault(author, [0, 0, 0])
+            total[0] += files
+            total[1] += insertions
+            total[2] += deletions
+        if cache is not None:
+            cache.save(branch, tip, totals)
+    for author, (files, insertions, deletions) in totals.items():
+        yield f"{files};{insertions};{deletions};{author};{branch}"
+    print("Done.", file=sys.stderr)
+
+
+class StatsCache:
+    """Per-branch author totals and the tip they were computed up to.
+
+    Stored under CACHE_DIR, one JSON file per repository. An entry is only
+    reused while its tip is still an ancestor of the branch; after a
+    force-push or rewrite it is dropped and the branch is read in full.
+    """
+
+    def __init__(self):
+        git_dir = check_output(
+            ("git", "rev-parse", "--path-format=absolute", "--git-common-dir")
+        ).strip()
+        key = hashlib.sha1(git_dir.encode()).hexdigest()[:16]
+        self._path = CACHE_DIR / f"{key}.json"
+        try:
+            self._data = json.loads(self._path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._data = {}
+
+    def load(self, branch, tip):
+        """Return (last_tip, totals) for `branch` if still valid for `tip`."""
+        entry = self._data.get(branch)
+        if entry is None:
+            return None
+        if entry["tip"] != tip and not git_is_ancestor(entry["tip"], tip):
+            print(f"{branch} was rewritten, discarding cached stats", file=sys.stderr)
+            return None
+        return entry["tip"], entry["totals"]
+
+    def save(self, branch, tip, totals):
+        self._data[branch] = {"tip": tip, "totals": totals}
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self._path.parent, delete=False
+        ) as tmp:
+            json.dump(self._data, tmp)
+        os.replace(tmp.name, self._path)
+
+
+def columnar_report(args):
+    """Per-commit columns saved with NumPy, and rollups computed over them."""
+    if np is None:
+        print("--columnar and --rollup need numpy", file=sys.stderr)
+        return 1
+    if args.from_columnar:
+        with np.load(args.from_columnar) as saved:
+            commits = dict(saved)
+    else:
+        commits = collect_commits(git_current_branch())
+    if args.columnar:
+        np.savez_compressed(args.columnar, **commits)
+        print(f"{len(commits['timestamp'])} commits written", file=sys.stderr)
+    if args.rollup:
+        with out_file(args.output) as out:
+            for line in rollup(commits, args.rollup):
+                print(line, file=out)
+    return 0
+
+
+def collect_commits(branch):
+    """One row per commit: author timestamp, author code and shortstat counts.
+
+    Author codes index into the "authors" array, which keeps the file compact
+    and lets rollups group on integers.
+    """
+    authors = {}
+    columns = {name: array("q") for name in COLUMNS}
+    print(f"Collecting commits on {branch}...", file=sys.stderr)
+    for timestamp, author, files, insertions, deletions in stream_shortstats(branch):
+        columns["timestamp"].append(timestamp)
+        columns["author"].append(authors.setdefault(author, len(authors)))
+        columns["files"].append(files)
+        columns["insertions"].append(insertions)
+        columns["deletions"].append(deletions)
+    commits = {name: np.array(col, dtype=np.int64) for name, col in columns.items()}
+    commits["authors"] = np.array(list(authors), dtype=str)
+    return commits
+
+
+def rollup(commits, period):
+    """Yield CSV rows summing files/insertions/deletions per period and author."""
+    authors = commits["authors"]
+    author = commits["author"]
+    timestamps = commits["timestamp"]
+    if period == "week":
+        buckets = (timestamps + EPOCH_TO_MONDAY) // WEEK
+    elif period == "month":
+        buckets = timestamps.astype("datetime64[s]").astype("datetime64[M]")
+        buckets = buckets.astype(np.int64)
+    else:
+        buckets = np.zeros_like(author)
+    keys, groups = np.unique(buckets * len(authors) + author, return_inverse=True)
+    sums = [
+        np.bincount(groups, weights=commits[name], minlength=len(keys)).astype(np.int64)
+        for name in ("files", "insertions", "deletions")
+    ]
+
+    if period == "author":
+        yield "files;insertions;deletions;author"
+    else:
+        yield "period;files;insertions;deletions;author"
+    for key, files, insertions, deletions in zip(keys, *sums):
+        bucket, code = divmod(int(key), len(authors))
+        row = f"{files};{insertions};{deletions};{authors[code]}"
+        if period == "week":
+            start = np.datetime64(bucket * WEEK - EPOCH_TO_MONDAY, "s")
+            row = f"{start.astype('datetime64[D]')};{row}"
+        elif period == "month":
+            row = f"{np.datetime64(bucket, 'M')};{row}"
+        yield row
+
+
+def stream_shortstats(revisions):
+    """Yield (timestamp, author, files, insertions, deletions) per commit.
+
+    Commits without a diff (merges) yield nothing.
+    """
+    git = (
+        "git",
+        "log",
+        "--shortstat",
+        "--format=%x00%at %aN <%aE>",
+        revisions,
+    )
+    with subprocess.Popen(
+        git, stdout=subprocess.PIPE, encoding="utf-8", errors="ignore"
+    ) as process:
+        author = None
+        for line in process.stdout:
+            if line.startswith(COMMIT_MARKER):
+                timestamp, author = line[1:].rstrip("\n").split(" ", 1)
+                continue
+            match = SHORTSTAT.match(line)
+            if match and author is not None:
+                files, insertions, deletions = (int(n or 0) for n in match.groups())
+                yield int(timestamp), author, files, insertions, deletions
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, git)
+
+
+def git_rev_parse(revision):
+    git = ("git", "rev-parse", "--verify", f"{revision}^{{commit}}")
+    return check_output(git).strip()
+
+
+def git_is_ancestor(ancestor, descendant):
+    git = ("git", "merge-base", "--is-ancestor", ancestor, descendant)
+    return subprocess.run(git, stderr=subprocess.DEVNULL).returncode == 0
+
+
+def git_current_branch():
+    try:
+        return check_output(("git", "symbolic-ref", "--short", "-q", "HEAD")).strip()
+    except subprocess.CalledProcessError:
+        return "HEAD"
+
+
 def git_authors():
     print("Fetching list of committers...", file=sys.stderr)
     return check_output(("git-authors")).splitlines()
@@ -64,11 +301,49 @@ def out_file(file):
 def parse_args(argv):
     parser = argparse.ArgumentParser()
     parser.add_argument("--output", "-o", help="Output file")
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--per-author",
+        action="store_true",
+        help="run git-insertions once per author instead of a single history pass",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="with --per-author, run N author queries concurrently (0: one per CPU)",
+    )
+    parser.add_argument(
+        "--columnar",
+        metavar="FILE",
+        help="write one row per commit (timestamp, author, counts) to a NumPy .npz",
+    )
+    parser.add_argument(
+        "--from-columnar",
+        metavar="FILE",
+        help="read commits from a --columnar file instead of git",
+    )
+    parser.add_argument(
+        "--rollup",
+        choices=("week", "month", "author"),
+        help="print totals per week, month or author instead of per-branch totals",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="recompute from the root commit instead of resuming from the last run",
+    )
+    args = parser.parse_args(argv)
+    if args.from_columnar and not (args.columnar or args.rollup):
+        parser.error("--from-columnar needs --rollup or --columnar")
+    if args.jobs < 1:
+        args.jobs = os.cpu_count() or 1
+    return args
 
 
 if __name__ == "__main__":
     try:
-        main(parse_args(sys.argv[1:]))
+        sys.exit(main(parse_args(sys.argv[1:])))
     except KeyboardInterrupt:
         print()
@@ -15,8 +15,12 @@ package lists live in .list files next to this script.
 from __future__ import annotations
 
 import argparse
+import contextvars
+import hashlib
+import json
 import logging
 import os
+import platform
 import re
 import shlex
 import shutil
@@ -24,18 +28,34 @@ import subprocess
 import sys
 import tarfile
 import tempfile
+import time
+import tomllib
 import typing
-from dataclasses import dataclass, field
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 import httpx  # ty: ignore[unresolved-import]
 from pydantic import BaseModel  # ty: ignore[unresolved-import]
+from rich.console import Console  # ty: ignore[unresolved-import]
 from rich.logging import RichHandler  # ty: ignore[unresolved-import]
+from rich.table import Table  # ty: ignore[unresolved-import]
 
 type Installer = typing.Callable[[Config], None]
 
 log = logging.getLogger(Path(__file__).stem)
 
+# Label of the step running in the current thread, set only when steps run
+# concurrently: log lines get prefixed with it and command output is captured.
+current_step: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_step", default=None
+)
+# Counters of the step running in the current thread, whatever the job count.
+current_stats: contextvars.ContextVar[StepStats | None] = contextvars.ContextVar(
+    "current_stats", default=None
+)
+
 PACKAGES_DIR = Path(__file__).resolve().parent
 MISE_CONFIG = PACKAGES_DIR.parent / "mise" / "config.toml"
 
@@ -46,11 +66,34 @@ OH_MY_ZSH_REPO = "ohmyzsh/ohmyzsh"
 MISE_INSTALL_URL = "https://mise.run"
 APT_NO_RECOMMENDS_SUFFIX = "[no-recommends]"
 NO_DESKTOP_APT_LIST = "apt-no-desktop.list"
+DPKG_STATUS = Path("/var/lib/dpkg/status")
+APT_LISTS = Path("/var/lib/apt/lists")
+# `apt-get update` touches at least one of these; the newest mtime is the age
+# of the package lists.
+APT_UPDATE_STAMPS = (
+    Path("/var/lib/apt/periodic/update-success-stamp"),
+    APT_LISTS / "partial",
+    APT_LISTS,
+)
+APT_UPDATE_MAX_AGE = timedelta(hours=6)
+DPKG_FIELD = re.compile(r"^(Package|Status|Architecture|Provides): *(.*)$", re.M)
+RUSTUP_INIT_URL = "https://sh.rustup.rs"
+# curl --write-out for run_piped: bytes and seconds, on a line of their own.
+CURL_TRANSFER = "%{stderr}\n%{size_download} %{time_total}\n"
+BUNDLE_MANIFEST = "manifest.json"
 
 
 class GitHubAsset(BaseModel):
     name: str
     browser_download_url: str
+    digest: str | None = None
+
+    @property
+    def sha256(self) -> str | None:
+        """The asset's SHA-256, when GitHub reports one as "sha256:<hex>"."""
+        if self.digest and self.digest.startswith("sha256:"):
+            return self.digest.removeprefix("sha256:")
+        return None
 
 
 class GitHubRelease(BaseModel):
@@ -71,6 +114,43 @@ class AptPackage:
     no_recommends: bool = False
 
 
+@dataclass(frozen=True)
+class Step:
+    label: str
+    install: Installer
+    # Labels of steps that must finish first; ones not in the run are ignored.
+    after: tuple[str, ...] = ()
+
+
+@dataclass
+class StepStats:
+    """Where one step's time went, for the run report.
+
+    `subprocess_seconds` is wall time spent waiting on commands and
+    `network_seconds` wall time spent on transfers this script makes itself:
+    GitHub API calls, downloads and the curl of a 'curl | sh' installer. The
+    rest of `wall_seconds` is this process's own work, mostly disk I/O.
+    Transfers made by git, apt, rustup or mise count as command time, and
+    their bytes are not in `bytes_downloaded`.
+    """
+
+    label: str
+    ok: bool = True
+    # Seconds since the first step started.
+    started: float = 0.0
+    wall_seconds: float = 0.0
+    subprocess_seconds: float = 0.0
+    network_seconds: float = 0.0
+    child_cpu_seconds: float = 0.0
+    subprocesses: int = 0
+    bytes_downloaded: int = 0
+
+    @property
+    def other_seconds(self) -> float:
+        waiting = self.subprocess_seconds + self.network_seconds
+        return max(self.wall_seconds - waiting, 0)
+
+
 @dataclass
 class Config:
     no_desktop: bool = False
@@ -78,6 +158,10 @@ class Config:
     refresh: bool = False
     refresh_tools: list[str] = field(default_factory=list)
     home: Path = field(default_factory=Path.home)
+    jobs: int = 0
+    export_bundle: Path | None = None
+    from_bundle: Path | None = None
+    report: Path | None = None
 
     @property
     def local_bin(self) -> Path:
@@ -91,36 +175,29 @@ class Config:
     def mise_shims(self) -> Path:
         return self.home / ".local" / "share" / "mise" / "shims"
 
+    @property
+    def download_cache(self) -> Path:
+        return self.home / ".cache" / "bootstrap" / "downloads"
+
+    @property
+    def report_path(self) -> Path:
+        return self.report or self.home / ".cache" / "bootstrap" / "report.json"
+
 
 def main(config: Config) -> int:
     config.local_bin.mkdir(parents=True, exist_ok=True)
     extend_path(config.local_bin, config.cargo_bin, config.mise_shims)
 
-    # On refresh we only update independently managed tools (mise, rustup,
-    # oh-my-zsh, fonts) and skip the system package manager.
-    if config.refresh:
-        steps: list[tuple[str, Installer]] = [
-            ("rustup", install_rustup),
-            ("mise tools", install_mise),
-            ("oh-my-zsh", install_oh_my_zsh),
-            ("Nerd Font", install_nerd_font),
-        ]
-    else:
-        steps = [
-            ("apt packages", install_apt),
-            ("rustup", install_rustup),
-            ("mise tools", install_mise),
-            ("oh-my-zsh", install_oh_my_zsh),
-            ("Nerd Font", install_nerd_font),
-        ]
-    failures: list[str] = []
-    for label, step in steps:
-        log.info("[bold]%s[/bold]", label, extra={"markup": True})
-        try:
-            step(config)
-        except Exception:
-            log.exception("failed during: %s", label)
-            failures.append(label)
+    if config.from_bundle and not config.dry_run:
+        if not verify_bundle(config.from_bundle):
+            return 1
+    started = datetime.now(UTC)
+    results = run_steps(config, plan_steps(config))
+    failures = [stats.label for stats in results if not stats.ok]
+    if config.export_bundle and not failures and not config.dry_run:
+        write_bundle_manifest(config.export_bundle)
+    print_summary(results)
+    write_report(config, results, started)
 
     if failures:
         log.error(
@@ -134,46 +211,257 @@ def main(config: Config) -> int:
     return 0
 
 
+def plan_steps(config: Config) -> list[Step]:
+    if config.export_bundle:
+        return [
+            Step("apt packages", export_apt),
+            Step("rustup", export_rustup),
+            Step("oh-my-zsh", export_oh_my_zsh),
+            Step("Nerd Font", export_nerd_font),
+            Step("uv and Python", export_python),
+        ]
+    if config.from_bundle:
+        return [
+            Step("apt packages", install_apt_from_bundle),
+            Step("rustup", install_rustup_from_bundle),
+            Step("oh-my-zsh", install_oh_my_zsh_from_bundle, after=("apt packages",)),
+            Step("Nerd Font", install_nerd_font_from_bundle, after=("apt packages",)),
+        ]
+    # curl and git come from bootstrap.sh. The cargo backend in the mise
+    # config builds with rustup's cargo and apt's -dev packages, the oh-my-zsh
+    # installer needs apt's zsh, and the font step apt's fc-cache (fontconfig).
+    steps = [
+        Step("apt packages", install_apt),
+        Step("rustup", install_rustup),
+        Step("mise tools", install_mise, after=("apt packages", "rustup")),
+        Step("oh-my-zsh", install_oh_my_zsh, after=("apt packages",)),
+        Step("Nerd Font", install_nerd_font, after=("apt packages",)),
+    ]
+    # On refresh we only update independently managed tools (mise, rustup,
+    # oh-my-zsh, fonts) and skip the system package manager.
+    if config.refresh:
+        steps = [step for step in steps if step.install is not install_apt]
+    return steps
+
+
+def run_steps(config: Config, steps: list[Step]) -> list[StepStats]:
+    """Run every step once the steps it comes after are done.
+
+    Returns each step's stats in the order they finished.
+
+    Independent steps run concurrently, up to `config.jobs` at a time (all of
+    them when 0). A failed step still counts as done for the ones after it,
+    as when the steps ran in a fixed order.
+    """
+    jobs = config.jobs or len(steps)
+    labels = {step.label for step in steps}
+    waiting = {step.label: set(step.after) & labels for step in steps}
+    running: dict[Future[StepStats], Step] = {}
+    results: list[StepStats] = []
+    epoch = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+
+        def start_ready():
+            for step in steps:
+                if step.label in waiting and not waiting[step.label]:
+                    del waiting[step.label]
+                    running[pool.submit(run_step, config, step, jobs > 1, epoch)] = step
+
+        start_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                results.append(future.result())
+                for after in waiting.values():
+                    after.discard(step.label)
+            start_ready()
+    if waiting:
+        raise ValueError(f"dependency cycle between steps: {', '.join(waiting)}")
+    return results
+
+
+def run_step(config: Config, step: Step, concurrent: bool, epoch: float) -> StepStats:
+    log.info("[bold]%s[/bold]", step.label, extra={"markup": True})
+    start = time.perf_counter()
+    stats = StepStats(step.label, started=start - epoch)
+    token = current_step.set(step.label if concurrent else None)
+    stats_token = current_stats.set(stats)
+    try:
+        step.install(config)
+    except Exception:
+        log.exception("failed during: %s", step.label)
+        stats.ok = False
+    finally:
+        current_stats.reset(stats_token)
+        current_step.reset(token)
+        stats.wall_seconds = time.perf_counter() - start
+    return stats
+
+
+def print_summary(results: list[StepStats]):
+    table = Table(
+        title="bootstrap steps",
+        caption="cmd: waiting on commands, net: on httpx and curl transfers, "
+        "cpu: commands' CPU, fetched: httpx and curl bytes (not git, apt, "
+        "rustup or mise)",
+    )
+    table.add_column("step")
+    table.add_column("")
+    for column in ("start", "wall", "cmd", "net", "other", "cpu", "procs", "fetched"):
+        table.add_column(column, justify="right")
+    for stats in sorted(results, key=lambda stats: stats.started):
+        table.add_row(
+            stats.label,
+            "[green]ok[/green]" if stats.ok else "[red]failed[/red]",
+            f"+{stats.started:.1f}s",
+            f"{stats.wall_seconds:.1f}s",
+            f"{stats.subprocess_seconds:.1f}s",
+            f"{stats.network_seconds:.1f}s",
+            f"{stats.other_seconds:.1f}s",
+            f"{stats.child_cpu_seconds:.1f}s",
+            str(stats.subprocesses),
+            format_bytes(stats.bytes_downloaded),
+        )
+    Console(stderr=True).print(table)
+
+
+def write_report(config: Config, results: list[StepStats], started: datetime):
+    """Write the run's per-step stats as JSON, to compare runs across hosts."""
+    mode = "export-bundle" if config.export_bundle else "from-bundle"
+    if not (config.export_bundle or config.from_bundle):
+        mode = "refresh" if config.refresh else "install"
+    report = {
+        "started": started.isoformat(timespec="seconds"),
+        "hostname": platform.node(),
+        "host": bundle_host(),
+        "mode": mode,
+        "dry_run": config.dry_run,
+        "jobs": config.jobs,
+        "apt_packages": len(wanted_apt_packages(config)),
+        "mise_tools": count_mise_tools(),
+        "wall_seconds": round((datetime.now(UTC) - started).total_seconds(), 3),
+        "steps": [
+            {
+                name: round(value, 3) if isinstance(value, float) else value
+                for name, value in asdict(stats).items()
+            }
+            | {"other_seconds": round(stats.other_seconds, 3)}
+            for stats in sorted(results, key=lambda stats: stats.started)
+        ],
+    }
+    path = config.report_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    log.info("run report written to %s", path)
+
+
+def count_mise_tools() -> int:
+    try:
+        with open(MISE_CONFIG, "rb") as f:
+            return len(tomllib.load(f).get("tools", {}))
+    except (OSError, tomllib.TOMLDecodeError):
+        return 0
+
+
+def format_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
 def install_apt(config: Config):
-    packages = read_apt_list("apt.list")
-    if config.no_desktop:
-        excluded_packages = set(read_list(NO_DESKTOP_APT_LIST))
-        packages = [p for p in packages if p.name not in excluded_packages]
+    packages = missing_apt_packages(config)
+    if not packages or config.dry_run:
+        return
+    age = apt_lists_age()
+    if age is None or age > APT_UPDATE_MAX_AGE:
+        run(as_root(["apt-get", "update", "-qq"]))
+    else:
+        log.info("apt package lists are %s old, skipping apt-get update", age)
+    apt_get_install(packages)
+
+
+def missing_apt_packages(config: Config) -> list[AptPackage]:
+    """The apt.list packages not installed yet; logs them on a dry run."""
+    packages = wanted_apt_packages(config)
     if not packages:
         log.warning("no apt packages to install")
-        return
-    default_packages = [p.name for p in packages if not p.no_recommends]
-    no_recommends_packages = [p.name for p in packages if p.no_recommends]
-    if no_recommends_packages:
+        return []
+    installed = installed_dpkg_packages()
+    missing = [p for p in packages if p.name not in installed]
+    if not missing:
+        log.info("all %d apt packages already installed", len(packages))
+        return []
+    log.debug(
+        "already installed: %d of %d", len(packages) - len(missing), len(packages)
+    )
+    no_recommends = sum(p.no_recommends for p in missing)
+    if no_recommends:
         log.info(
             "installing %d apt packages (%d without recommends)",
-            len(packages),
-            len(no_recommends_packages),
+            len(missing),
+            no_recommends,
         )
     else:
-        log.info("installing %d apt packages", len(packages))
+        log.info("installing %d apt packages", len(missing))
     if config.dry_run:
-        for package in default_packages:
-            log.info("%s", package)
-        for package in no_recommends_packages:
-            log.info("%s %s", package, APT_NO_RECOMMENDS_SUFFIX)
-        return
-    run(as_root(["apt-get", "update", "-qq"]))
+        for package in missing:
+            if package.no_recommends:
+                log.info("%s %s", package.name, APT_NO_RECOMMENDS_SUFFIX)
+            else:
+                log.info("%s", package.name)
+    return missing
+
+
+def apt_get_install(packages: list[AptPackage], options: list[str] | None = None):
+    """Install `packages`, honouring [no-recommends], and let apt pick the rest."""
+    apt_get = ["apt-get", *(options or []), "install", "-y", "-qq"]
+    default_packages = [p.name for p in packages if not p.no_recommends]
+    no_recommends_packages = [p.name for p in packages if p.no_recommends]
     if default_packages:
-        run(as_root(["apt-get", "install", "-y", "-qq", *default_packages]))
+        run(as_root([*apt_get, *default_packages]))
     if no_recommends_packages:
-        run(
-            as_root(
-                [
-                    "apt-get",
-                    "install",
-                    "-y",
-                    "-qq",
-                    "--no-install-recommends",
-                    *no_recommends_packages,
-                ]
-            )
-        )
+        run(as_root([*apt_get, "--no-install-recommends", *no_recommends_packages]))
+
+
+def wanted_apt_packages(config: Config) -> list[AptPackage]:
+    packages = read_apt_list("apt.list")
+    if config.no_desktop:
+        excluded_packages = set(read_list(NO_DESKTOP_APT_LIST))
+        packages = [p for p in packages if p.name not in excluded_packages]
+    return packages
+
+
+def installed_dpkg_packages(status_file: Path = DPKG_STATUS) -> set[str]:
+    """Installed package names (also as name:arch) and the names they provide."""
+    try:
+        text = status_file.read_text(errors="replace")
+    except FileNotFoundError:
+        return set()
+    installed: set[str] = set()
+    for stanza in text.split("\n\n"):
+        fields = dict(DPKG_FIELD.findall(stanza))
+        if not fields.get("Status", "").endswith(" installed"):
+            continue
+        name = fields["Package"]
+        installed.add(name)
+        installed.add(f"{name}:{fields.get('Architecture', '')}")
+        for provided in fields.get("Provides", "").split(","):
+            if provided := provided.split("(")[0].strip():
+                installed.add(provided)
+    return installed
+
+
+def apt_lists_age() -> timedelta | None:
+    """Time since the last `apt-get update`, or None if it never ran."""
+    mtimes = [path.stat().st_mtime for path in APT_UPDATE_STAMPS if path.exists()]
+    if not mtimes or not any(APT_LISTS.glob("*_Packages*")):
+        return None
+    return timedelta(seconds=round(time.time() - max(mtimes)))
 
 
 def install_rustup(config: Config):
@@ -186,7 +474,7 @@ def install_rustup(config: Config):
         run(["rustup", "update"])
     else:
         run_piped(
-            ["curl", "--proto", "=https", "--tlsv1.2", "-sSf", "https://sh.rustup.rs"],
+            ["curl", "--proto", "=https", "--tlsv1.2", "-sSf", RUSTUP_INIT_URL],
             stdin_to=["sh", "-s", "--", "-y"],
         )
         source_cargo_env()
@@ -258,8 +546,6 @@ def install_nerd_font(config: Config):
     if config.dry_run:
         log.info("download %s.tar.xz to ~/.local/share/fonts", NERD_FONT)
         return
-    font_dir = config.home / ".local" / "share" / "fonts"
-    font_dir.mkdir(parents=True, exist_ok=True)
     release = get_latest_release(NERD_FONTS_REPO)
     if not release:
         log.warning("could not fetch Nerd Font releases")
@@ -269,16 +555,346 @@ def install_nerd_font(config: Config):
     if not asset:
         log.warning("could not find Nerd Font release for %s", NERD_FONT)
         return
-    log.info("downloading %s", asset.browser_download_url)
-    with tempfile.TemporaryDirectory() as tmp:
-        archive = Path(tmp) / "font.tar.xz"
-        download(asset.browser_download_url, archive)
-        with tarfile.open(archive) as tf:
-            tf.extractall(tmp)
-        for font_file in Path(tmp).glob("*.[to]tf"):
-            shutil.copy2(font_file, font_dir)
-    if has("fc-cache"):
-        run(["fc-cache", "-f", str(font_dir)])
+    archive, digest = cached_download(
+        config,
+        asset.browser_download_url,
+        version=release.tag_name,
+        sha256=asset.sha256,
+    )
+    install_font_archive(config, archive, digest, release.tag_name)
+
+
+def install_font_archive(config: Config, archive: Path, digest: str, version: str):
+    font_dir = config.home / ".local" / "share" / "fonts"
+    font_dir.mkdir(parents=True, exist_ok=True)
+    # Which archive the installed files came from, their sizes, and whether
+    # fc-cache has indexed them, so an unchanged release is neither extracted
+    # again nor re-indexed.
+    stamp = font_dir / f".{NERD_FONT}-nerd-font.json"
+    if not fonts_installed(stamp, font_dir, digest):
+        installed: dict[str, int] = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            with tarfile.open(archive) as tf:
+                tf.extractall(tmp)
+            for font_file in Path(tmp).glob("*.[to]tf"):
+                shutil.copy2(font_file, font_dir)
+                installed[font_file.name] = font_file.stat().st_size
+        recorded = {"archive_sha256": digest, "files": installed, "indexed": False}
+        stamp.write_text(json.dumps(recorded))
+    elif read_stamp(stamp).get("indexed"):
+        log.info("%s Nerd Font %s already installed", NERD_FONT, version)
+        return
+    if not has("fc-cache"):
+        log.warning("fc-cache not found, font cache not rebuilt")
+        return
+    run(["fc-cache", "-f", str(font_dir)])
+    stamp.write_text(json.dumps(read_stamp(stamp) | {"indexed": True}))
+
+
+def read_stamp(stamp: Path) -> dict[str, typing.Any]:
+    try:
+        recorded = json.loads(stamp.read_text())
+    except (OSError, ValueError):
+        return {}
+    return recorded if isinstance(recorded, dict) else {}
+
+
+def fonts_installed(stamp: Path, font_dir: Path, archive_sha256: str) -> bool:
+    """True if `stamp` says this archive was installed and its files are intact."""
+    recorded = read_stamp(stamp)
+    if recorded.get("archive_sha256") != archive_sha256 or not recorded.get("files"):
+        return False
+    for name, size in recorded["files"].items():
+        path = font_dir / name
+        if not path.is_file() or path.stat().st_size != size:
+            return False
+    return True
+
+
+def export_apt(config: Config):
+    """Download the .deb files for apt.list and everything they depend on.
+
+    The dependency closure is resolved on this host, so the bundle installs on
+    hosts running the same release and architecture. A Packages index is
+    written next to the debs, making the directory a flat apt repository.
+    """
+    packages = wanted_apt_packages(config)
+    apt_dir = bundle_path(config, "apt")
+    log.info("downloading %d apt packages and their dependencies", len(packages))
+    if config.dry_run:
+        log.info("apt-get download <closure> into %s", apt_dir)
+        return
+    names: set[str] = set()
+    for no_recommends in (False, True):
+        roots = [p.name for p in packages if p.no_recommends == no_recommends]
+        if roots:
+            names.update(apt_dependency_closure(roots, recommends=not no_recommends))
+    apt_dir.mkdir(parents=True, exist_ok=True)
+    for deb in apt_dir.glob("*.deb"):
+        deb.unlink()
+    run(["apt-get", "download", *sorted(names)], cwd=apt_dir)
+    write_apt_index(apt_dir)
+
+
+def write_apt_index(apt_dir: Path):
+    """Write the Packages file of a flat repository holding apt_dir's debs."""
+    stanzas = []
+    for deb in sorted(apt_dir.glob("*.deb")):
+        control = run_output(["dpkg-deb", "--field", str(deb)]).rstrip("\n")
+        stanzas.append(
+            f"{control}\nFilename: ./{deb.name}\nSize: {deb.stat().st_size}\n"
+            f"SHA256: {file_sha256(deb)}\n"
+        )
+    (apt_dir / "Packages").write_text("\n".join(stanzas))
+
+
+def apt_dependency_closure(packages: list[str], *, recommends: bool) -> set[str]:
+    """Real package names `packages` need; virtual ones print as <name>."""
+    cmd = ["apt-cache", "depends", "--recurse", "--no-suggests", "--no-conflicts"]
+    cmd += ["--no-breaks", "--no-replaces", "--no-enhances"]
+    if not recommends:
+        cmd.append("--no-recommends")
+    output = run_output([*cmd, *packages])
+    return {line for line in output.splitlines() if re.match(r"^\w", line)}
+
+
+def export_rustup(config: Config):
+    """Install rustup and the toolchain into the bundle instead of $HOME."""
+    rustup_dir = bundle_path(config, "rustup")
+    log.info("installing rustup into %s", rustup_dir)
+    if config.dry_run:
+        log.info("curl ... %s | sh -s -- -y --no-modify-path", RUSTUP_INIT_URL)
+        return
+    env = {
+        **os.environ,
+        "RUSTUP_HOME": str(rustup_dir / "rustup"),
+        "CARGO_HOME": str(rustup_dir / "cargo"),
+    }
+    rustup = rustup_dir / "cargo" / "bin" / "rustup"
+    if rustup.exists():
+        run([str(rustup), "update"], env=env)
+    else:
+        run_piped(
+            ["curl", "--proto", "=https", "--tlsv1.2", "-sSf", RUSTUP_INIT_URL],
+            stdin_to=["sh", "-s", "--", "-y", "--no-modify-path"],
+            env=env,
+        )
+    for component in read_list("rustup.list"):
+        run([str(rustup), "component", "add", component], env=env)
+
+
+def export_oh_my_zsh(config: Config):
+    log.info("cloning oh-my-zsh into the bundle")
+    if config.dry_run:
+        log.info("git clone %s", OH_MY_ZSH_REPO)
+        return
+    _git_clone_or_pull(
+        f"https://github.com/{OH_MY_ZSH_REPO}.git", bundle_path(config, "oh-my-zsh")
+    )
+
+
+def export_nerd_font(config: Config):
+    log.info("downloading Nerd Font into the bundle: %s", NERD_FONT)
+    if config.dry_run:
+        log.info("download %s.tar.xz", NERD_FONT)
+        return
+    release = get_latest_release(NERD_FONTS_REPO)
+    pattern = re.compile(rf"{re.escape(NERD_FONT)}\.tar\.(xz|gz)$")
+    asset = release.find_asset(pattern) if release else None
+    if not release or not asset:
+        raise RuntimeError(f"could not find a Nerd Font release for {NERD_FONT}")
+    archive, _ = cached_download(
+        config,
+        asset.browser_download_url,
+        version=release.tag_name,
+        sha256=asset.sha256,
+    )
+    font_dir = bundle_path(config, "fonts")
+    shutil.rmtree(font_dir, ignore_errors=True)
+    font_dir.mkdir(parents=True)
+    shutil.copy2(archive, font_dir / f"{release.tag_name}-{asset.name}")
+
+
+def export_python(config: Config):
+    """Bundle uv, a uv-managed Python and wheels for this script's dependencies.
+
+    bootstrap.sh runs this script from them with `uv run --offline`, so the
+    bundled host needs neither PyPI nor the uv installer.
+    """
+    python_dir = bundle_path(config, "python")
+    version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    log.info("bundling uv, Python %s and this script's dependencies", version)
+    uv = os.environ.get("UV") or shutil.which("uv")
+    if uv is None:
+        raise RuntimeError("uv not found")
+    if config.dry_run:
+        log.info("uv python install %s; pip download the script's wheels", version)
+        return
+    shutil.rmtree(python_dir, ignore_errors=True)
+    python_dir.mkdir(parents=True)
+    shutil.copy2(uv, python_dir / "uv")
+    env = {
+        **os.environ,
+        "UV_PYTHON_INSTALL_DIR": str(python_dir / "interpreters"),
+        "UV_PYTHON_BIN_DIR": str(python_dir / "bin"),
+    }
+    run([uv, "python", "install", version], env=env)
+    requirements = python_dir / "requirements.txt"
+    run(
+        [uv, "export", "--script", __file__, "--no-hashes", "-o", str(requirements)],
+        env=env,
+    )
+    run(
+        [
+            uv,
+            "run",
+            "--python-preference",
+            "only-managed",
+            "--python",
+            version,
+            "--no-project",
+            "--with",
+            "pip",
+            "--",
+            "python",
+            "-m",
+            "pip",
+            "download",
+            "--only-binary=:all:",
+            "--dest",
+            str(python_dir / "wheels"),
+            "-r",
+            str(requirements),
+        ],
+        env=env,
+    )
+
+
+def install_apt_from_bundle(config: Config):
+    """Install the missing apt.list packages with the bundle as the only source.
+
+    apt resolves them as it would online, against the bundle's flat repository
+    instead of the host's sources, so alternatives, [no-recommends] and the
+    upgrades a new package needs are handled the same way.
+    """
+    packages = missing_apt_packages(config)
+    if not packages or config.dry_run:
+        return
+    apt_dir = bundle_path(config, "apt").resolve()
+    if not (apt_dir / "Packages").is_file():
+        raise RuntimeError(f"{apt_dir} has no Packages index, export the bundle again")
+    with tempfile.TemporaryDirectory(prefix="bootstrap-apt-") as tmp:
+        sources = Path(tmp) / "bundle.list"
+        sources.write_text(f"deb [trusted=yes] file:{apt_dir} ./\n")
+        (Path(tmp) / "lists" / "partial").mkdir(parents=True)
+        # Separate package lists, so the host's are neither used nor replaced.
+        settings = [
+            f"Dir::Etc::SourceList={sources}",
+            "Dir::Etc::SourceParts=-",
+            f"Dir::State::Lists={tmp}/lists",
+            "APT::Sandbox::User=root",
+        ]
+        options = [arg for setting in settings for arg in ("-o", setting)]
+        run(as_root(["apt-get", *options, "update", "-qq"]))
+        apt_get_install(packages, options)
+
+
+def install_rustup_from_bundle(config: Config):
+    log.info("installing rustup from the bundle")
+    if has("rustup"):
+        log.warning("rustup already installed")
+        return
+    if config.dry_run:
+        log.info("copy the bundled rustup and cargo homes to ~/.rustup, ~/.cargo")
+        return
+    rustup_dir = bundle_path(config, "rustup")
+    shutil.copytree(rustup_dir / "rustup", config.home / ".rustup", dirs_exist_ok=True)
+    shutil.copytree(rustup_dir / "cargo", config.home / ".cargo", dirs_exist_ok=True)
+    source_cargo_env()
+
+
+def install_oh_my_zsh_from_bundle(config: Config):
+    log.info("installing oh-my-zsh from the bundle")
+    oh_my_zsh_dir = config.home / ".oh-my-zsh"
+    if oh_my_zsh_dir.exists():
+        log.warning("oh-my-zsh already installed")
+        return
+    if config.dry_run:
+        log.info("copy the bundled checkout to %s", oh_my_zsh_dir)
+        return
+    shutil.copytree(bundle_path(config, "oh-my-zsh"), oh_my_zsh_dir, symlinks=True)
+    zshrc = config.home / ".zshrc"
+    if not zshrc.exists():
+        shutil.copy2(oh_my_zsh_dir / "templates" / "zshrc.zsh-template", zshrc)
+
+
+def install_nerd_font_from_bundle(config: Config):
+    log.info("installing Nerd Font from the bundle: %s", NERD_FONT)
+    if config.dry_run:
+        log.info("extract the bundled archive to ~/.local/share/fonts")
+        return
+    archives = sorted(bundle_path(config, "fonts").glob("*.tar.*"))
+    if not archives:
+        raise RuntimeError("no Nerd Font archive in the bundle")
+    archive = archives[-1]
+    version = archive.name.split("-", 1)[0]
+    install_font_archive(config, archive, file_sha256(archive), version)
+
+
+def bundle_path(config: Config, *parts: str) -> Path:
+    bundle = config.export_bundle or config.from_bundle
+    if bundle is None:
+        raise ValueError("no bundle directory configured")
+    return bundle.joinpath(*parts)
+
+
+def write_bundle_manifest(bundle: Path):
+    """Record every bundled file's SHA-256 and the host the bundle is for."""
+    files = {
+        str(path.relative_to(bundle)): file_sha256(path)
+        for path in sorted(bundle.rglob("*"))
+        if path.is_file() and not path.is_symlink() and path.name != BUNDLE_MANIFEST
+    }
+    manifest = {"host": bundle_host(), "files": files}
+    (bundle / BUNDLE_MANIFEST).write_text(json.dumps(manifest, indent=1) + "\n")
+    log.info("wrote %d files to bundle %s", len(files), bundle)
+
+
+def verify_bundle(bundle: Path) -> bool:
+    """Check the bundle against its manifest before installing anything."""
+    try:
+        manifest = json.loads((bundle / BUNDLE_MANIFEST).read_text())
+    except (OSError, ValueError) as exc:
+        log.error("cannot read bundle manifest: %s", exc)
+        return False
+    files = manifest.get("files") if isinstance(manifest, dict) else None
+    if not isinstance(files, dict):
+        log.error("bad bundle manifest: no file list in %s", bundle / BUNDLE_MANIFEST)
+        return False
+    if manifest.get("host") != bundle_host():
+        log.warning(
+            "bundle was made for %s, this is %s", manifest.get("host"), bundle_host()
+        )
+    bad = [
+        name
+        for name, digest in files.items()
+        if not (bundle / name).is_file() or file_sha256(bundle / name) != digest
+    ]
+    for name in bad:
+        log.error("bundle file missing or corrupt: %s", name)
+    return not bad
+
+
+def bundle_host() -> dict[str, str]:
+    """What the apt closure and the rust toolchain in a bundle depend on."""
+    try:
+        release = platform.freedesktop_os_release()
+    except OSError:
+        release = {}
+    return {
+        "machine": platform.machine(),
+        "os": f"{release.get('ID', '')} {release.get('VERSION_CODENAME', '')}".strip(),
+    }
 
 
 def read_list(name: str) -> list[str]:
@@ -310,20 +926,101 @@ def parse_apt_package(entry: str) -> AptPackage:
 
 
 def run(cmd: list[str], **kwargs: typing.Any):
-    """Run a command, raising on failure."""
+    """Run a command, raising on failure.
+
+    While steps run concurrently, the command's output is logged line by line
+    under its step's label instead of interleaving raw on the terminal.
+    """
+    log.debug("+ %s", " ".join(cmd))
+    capture = current_step.get() is not None
+    if capture:
+        kwargs = {
+            "stdout": subprocess.PIPE,
+            "stderr": subprocess.STDOUT,
+            "text": True,
+            "errors": "replace",
+            **kwargs,
+        }
+    start = time.perf_counter()
+    with subprocess.Popen(cmd, **kwargs) as proc:
+        if capture:
+            for line in typing.cast(typing.IO[str], proc.stdout):
+                log.info("%s", line.rstrip(), extra={"markup": False})
+        returncode = reap(proc)
+    if (stats := current_stats.get()) is not None:
+        stats.subprocess_seconds += time.perf_counter() - start
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def run_output(cmd: list[str]) -> str:
+    """Run a command and return its stdout, raising on failure."""
     log.debug("+ %s", " ".join(cmd))
-    subprocess.run(cmd, check=True, **kwargs)
+    start = time.perf_counter()
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+        output = typing.cast(typing.IO[str], proc.stdout).read()
+        returncode = reap(proc)
+    if (stats := current_stats.get()) is not None:
+        stats.subprocess_seconds += time.perf_counter() - start
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return output
+
+
+def run_piped(cmd: list[str], *, stdin_to: list[str], **kwargs: typing.Any):
+    """Run a 'curl ... | installer' pattern.
+
+    curl reports its transfer on stderr, which is charged to the step as
+    network time and bytes rather than as time waiting on the installer.
+    """
+    log.debug("+ %s | %s", shlex.join(cmd), shlex.join(stdin_to))
+    with subprocess.Popen(
+        [*cmd, "--write-out", CURL_TRANSFER],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+    ) as curl:
+        run(stdin_to, stdin=curl.stdout, **kwargs)
+        reap(curl)
+        lines = typing.cast(typing.IO[str], curl.stderr).read().splitlines()
+    if curl.returncode:
+        for line in filter(None, lines[:-1]):
+            log.warning("%s", line, extra={"markup": False})
+    try:
+        size, seconds = lines[-1].split()
+        received, elapsed = int(size), float(seconds)
+    except (IndexError, ValueError):
+        return
+    if (stats := current_stats.get()) is not None:
+        stats.bytes_downloaded += received
+        stats.network_seconds += elapsed
+        # The installer was waiting on curl for that long.
+        stats.subprocess_seconds = max(stats.subprocess_seconds - elapsed, 0)
 
 
-def run_piped(cmd: list[str], *, stdin_to: list[str]):
-    """Run a 'curl ... | installer' pattern."""
-    log.debug("+ %s | %s", shlex.join(cmd), shlex.join(stdin_to))
-    with subprocess.Popen(cmd, stdout=subprocess.PIPE) as curl:
-        subprocess.run(stdin_to, stdin=curl.stdout, check=True)
+def reap(proc: subprocess.Popen[typing.Any]) -> int:
+    """Wait for `proc` with wait4(2) and charge its CPU time to the current step.
+
+    The rusage covers the command and every descendant it waited for, which
+    RUSAGE_CHILDREN cannot split between steps running concurrently.
+    """
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if (stats := current_stats.get()) is not None:
+        stats.subprocesses += 1
+        stats.child_cpu_seconds += usage.ru_utime + usage.ru_stime
+    return proc.returncode
 
 
 def as_root(cmd: list[str]) -> list[str]:
-    """Run apt commands via sudo unless the current process is already root."""
+    """Run apt commands via sudo unless the current process is already root.
+
+    While output is captured (see `run`), a debconf prompt would never show,
+    so apt is told to take the defaults instead of waiting on one.
+    """
+    if current_step.get() is not None:
+        cmd = ["env", "DEBIAN_FRONTEND=noninteractive", *cmd]
     return cmd if os.geteuid() == 0 else ["sudo", *cmd]
 
 
@@ -347,11 +1044,13 @@ def source_cargo_env():
 def get_latest_release(repo: str) -> GitHubRelease | None:
     """Fetch and validate the latest release for a GitHub repo."""
     try:
+        start = time.perf_counter()
         resp = httpx.get(
             f"{GITHUB_API_BASE}/repos/{repo}/releases/latest",
             headers={"Accept": "application/vnd.github+json"},
             follow_redirects=True,
         )
+        count_network(start, len(resp.content))
         resp.raise_for_status()
         return GitHubRelease.model_validate(resp.json())
     except (httpx.HTTPError, Exception) as exc:
@@ -359,13 +1058,84 @@ def get_latest_release(repo: str) -> GitHubRelease | None:
         return None
 
 
-def download(url: str, dest: Path):
-    """Download a URL to a local file."""
-    with httpx.stream("GET", url, follow_redirects=True) as resp:
-        resp.raise_for_status()
-        with open(dest, "wb") as f:
-            for chunk in resp.iter_bytes():
-                f.write(chunk)
+def cached_download(
+    config: Config, url: str, *, version: str, sha256: str | None = None
+) -> tuple[Path, str]:
+    """Download a URL into the persistent cache; return its path and SHA-256.
+
+    Entries are keyed by URL plus `version` (a release tag or ETag), so a new
+    release is a new entry; once it is downloaded, the entries for older
+    versions of the URL are removed. A cached file is reused only if it still
+    matches `sha256`, or the digest recorded when it was downloaded.
+    """
+    url_key = hashlib.sha256(url.encode()).hexdigest()[:16]
+    version_key = hashlib.sha256(version.encode()).hexdigest()[:16]
+    name = f"{url_key}-{version_key}-{url.rsplit('/', 1)[-1]}"
+    dest = config.download_cache / name
+    recorded = dest.with_name(f"{dest.name}.sha256")
+    if dest.exists():
+        expected = sha256
+        if expected is None and recorded.exists():
+            expected = recorded.read_text().strip()
+        digest = file_sha256(dest)
+        if digest == expected:
+            log.info("using cached %s", url)
+            return dest, digest
+        log.warning("cached %s is corrupt, downloading again", dest)
+        dest.unlink()
+    log.info("downloading %s", url)
+    digest = download(url, dest, sha256=sha256)
+    recorded.write_text(f"{digest}\n")
+    # dest, its .sha256 and its .part all start with its name.
+    for old in config.download_cache.glob(f"{url_key}-*"):
+        if not old.name.startswith(name):
+            log.debug("removing %s from the download cache", old.name)
+            old.unlink(missing_ok=True)
+    return dest, digest
+
+
+def download(url: str, dest: Path, *, sha256: str | None = None) -> str:
+    """Download a URL to a local file and return its SHA-256.
+
+    Data is written to a .part file next to `dest` and renamed once complete;
+    an interrupted transfer is resumed from there with an HTTP Range request.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(f"{dest.name}.part")
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    start = time.perf_counter()
+    received = 0
+    with httpx.stream("GET", url, headers=headers, follow_redirects=True) as resp:
+        # 416: the .part file already holds the whole body.
+        if not (offset and resp.status_code == 416):
+            resp.raise_for_status()
+            resumed = offset > 0 and resp.status_code == 206
+            if resumed:
+                log.info("resuming %s at %d bytes", url, offset)
+            with open(part, "ab" if resumed else "wb") as f:
+                for chunk in resp.iter_bytes():
+                    f.write(chunk)
+                    received += len(chunk)
+    count_network(start, received)
+    digest = file_sha256(part)
+    if sha256 and digest != sha256:
+        part.unlink()
+        raise ValueError(f"checksum mismatch for {url}: {digest} != {sha256}")
+    part.replace(dest)
+    return digest
+
+
+def count_network(start: float, received: int):
+    """Charge a transfer begun at `start` (perf_counter) to the current step."""
+    if (stats := current_stats.get()) is not None:
+        stats.network_seconds += time.perf_counter() - start
+        stats.bytes_downloaded += received
+
+
+def file_sha256(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 
 def _git_clone_or_pull(repo: str, dest: Path, *, depth: int | None = 1) -> bool:
@@ -383,6 +1153,15 @@ def _git_clone_or_pull(repo: str, dest: Path, *, depth: int | None = 1) -> bool:
     return True
 
 
+class StepPrefix(logging.Filter):
+    """Prefix records with the label of the concurrent step that logged them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        label = current_step.get()
+        record.step = f"{label}: " if label else ""
+        return True
+
+
 def parse_args(argv: list[str] | None = None) -> Config:
     parser = argparse.ArgumentParser(
         description="Bootstrap a fresh Ubuntu/Debian system with required packages.",
@@ -404,6 +1183,37 @@ def parse_args(argv: list[str] | None = None) -> Config:
         help="update independently managed tools (mise, rustup, oh-my-zsh, "
         "fonts); optionally name specific mise tools to pass to `mise upgrade`",
     )
+    bundle = parser.add_mutually_exclusive_group()
+    bundle.add_argument(
+        "--export-bundle",
+        type=Path,
+        metavar="DIR",
+        help="download everything the bootstrap installs (apt debs, rustup and "
+        "its toolchain, oh-my-zsh, the Nerd Font) into DIR for offline hosts",
+    )
+    bundle.add_argument(
+        "--from-bundle",
+        type=Path,
+        metavar="DIR",
+        help="install from a bundle made by --export-bundle, without network; "
+        "mise tools are skipped",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="run at most N independent steps at once; 1 runs them one by one "
+        "with command output straight to the terminal (default: no limit)",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        metavar="FILE",
+        help="write the per-step timing report as JSON to FILE "
+        "(default: ~/.cache/bootstrap/report.json)",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -411,17 +1221,25 @@ def parse_args(argv: list[str] | None = None) -> Config:
         help="enable debug logging",
     )
     ns = parser.parse_args(argv)
+    if ns.refresh_independent is not None and (ns.export_bundle or ns.from_bundle):
+        parser.error("--refresh-independent cannot be combined with a bundle")
+    handler = RichHandler(rich_tracebacks=True, markup=True)
+    handler.addFilter(StepPrefix())
     logging.basicConfig(
         level=logging.DEBUG if ns.verbose else logging.INFO,
-        format="%(message)s",
+        format="%(step)s%(message)s",
         datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True, markup=True)],
+        handlers=[handler],
     )
     return Config(
         no_desktop=ns.no_desktop,
         dry_run=ns.dry_run,
         refresh=ns.refresh_independent is not None,
         refresh_tools=ns.refresh_independent or [],
+        jobs=max(ns.jobs, 0),
+        export_bundle=ns.export_bundle.resolve() if ns.export_bundle else None,
+        from_bundle=ns.from_bundle.resolve() if ns.from_bundle else None,
+        report=ns.report,
     )
 
 
@@ -3,12 +3,21 @@
 #/
 #/ Bootstrap a fresh Ubuntu/Debian system with required packages.
 #/ Installs minimal apt dependencies and uv, then delegates to bootstrap.py.
+#/ With --from-bundle, nothing is downloaded: bootstrap.py runs on the uv,
+#/ Python and wheels in the bundle.
 #/
 #/ Options:
 #/   --no-desktop    Skip sway/desktop packages
 #/   --refresh-independent
 #/                  Update independently installed tools to their latest managed version
 #/   --dry-run       Print what would be installed without doing it
+#/   --jobs N        Run at most N independent steps at once (1: one by one)
+#/   --export-bundle DIR
+#/                  Download everything into DIR for offline installs
+#/   --from-bundle DIR
+#/                  Install from a bundle made by --export-bundle, offline
+#/   --report FILE   Write the per-step timing report there (default:
+#/                  ~/.cache/bootstrap/report.json)
 #/   --verbose       Enable debug logging in bootstrap.py
 #/   --help          Show this help message
 
@@ -27,12 +36,29 @@ else
     APT_PREFIX=(sudo)
 fi
 
+BUNDLE=""
+prev=""
 for arg in "$@"; do
     case "$arg" in
         --help) usage; exit 0 ;;
+        --from-bundle=*) BUNDLE="${arg#*=}" ;;
     esac
+    if [[ $prev == --from-bundle ]]; then
+        BUNDLE="$arg"
+    fi
+    prev="$arg"
 done
 
+# Offline: skip the apt and uv installs and run on what the bundle carries
+if [[ -n $BUNDLE ]]; then
+    [[ -x $BUNDLE/python/uv ]] || err "no uv in $BUNDLE, export the bundle again"
+    log "handing off to bootstrap.py, offline"
+    export UV_PYTHON_INSTALL_DIR="$BUNDLE/python/interpreters"
+    exec "$BUNDLE/python/uv" run --offline --no-index \
+        --find-links "$BUNDLE/python/wheels" --python-preference only-managed \
+        --script "$SCRIPT_DIR/bootstrap.py" "$@"
+fi
+
 # Ensure minimal apt prerequisites for the rest of the bootstrap
 log "installing apt prerequisites"
 "${APT_PREFIX[@]}" apt-get update -qq
@@ -0,0 +1,128 @@
+"""Regression tests for .bin/github-repos against a fake GitHub API.
+
+Run with `python -m unittest discover tests` (needs httpx).
+"""
+
+import asyncio
+import contextlib
+import importlib.machinery
+import importlib.util
+import io
+import marshal
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import httpx
+
+SCRIPT = Path(__file__).resolve().parent.parent / ".bin" / "github-repos"
+
+
+def load_script():
+    loader = importlib.machinery.SourceFileLoader("github_repos", str(SCRIPT))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+github_repos = load_script()
+
+
+def repos_page(owner, page, pages):
+    """A 200 response for one page of `owner`'s repos, with a Link header."""
+    link = ""
+    if page < pages:
+        base = f"https://api.github.com/users/{owner}/repos?per_page=100"
+        link = (
+            f'<{base}&page={page + 1}>; rel="next", <{base}&page={pages}>; rel="last"'
+        )
+    return httpx.Response(
+        200,
+        json=[{"name": f"{owner}-{page}", "description": None}],
+        headers={"etag": f'"{owner}-{page}"', "link": link},
+    )
+
+
+RATE_LIMITED = httpx.Response(403, headers={"x-ratelimit-remaining": "0"})
+
+
+class GithubReposTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+        patcher = mock.patch.object(github_repos, "CACHE_DIR", self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_main(self, argv, handler):
+        """Run the script's main with `handler` answering every request."""
+
+        def client(*args, **kwargs):
+            kwargs.pop("http2", None)
+            kwargs["transport"] = httpx.MockTransport(handler)
+            return real_client(*args, **kwargs)
+
+        real_client = httpx.AsyncClient
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with (
+            mock.patch.object(github_repos.httpx, "AsyncClient", client),
+            contextlib.redirect_stdout(stdout),
+            contextlib.redirect_stderr(stderr),
+        ):
+            try:
+                code = asyncio.run(github_repos.main(github_repos.parse_args(argv)))
+            except SystemExit as exc:
+                code = exc.code
+        return code, stdout.getvalue().splitlines(), stderr.getvalue()
+
+    def test_expired_cache_rate_limited_on_revalidation_serves_cache(self):
+        code, out, _ = self.run_main(
+            ["u"], lambda request: repos_page("u", page_of(request), 3)
+        )
+        self.assertEqual((code, out), (0, ["u-1", "u-2", "u-3"]))
+        cache = self.cache_dir / "u.marshal"
+        data = marshal.loads(cache.read_bytes())
+        data["timestamp"] = 0
+        cache.write_bytes(marshal.dumps(data))
+
+        code, out, err = self.run_main(["--wait", "u"], lambda _: RATE_LIMITED)
+
+        self.assertEqual(code, 0)
+        self.assertEqual(out, ["u-1", "u-2", "u-3"])
+        self.assertIn("serving stale cache", err)
+
+    def test_rate_limited_owner_does_not_stop_the_others(self):
+        def handler(request):
+            owner = request.url.path.split("/")[2]
+            if owner == "b" and page_of(request) == 3:
+                return RATE_LIMITED
+            return repos_page(owner, page_of(request), 4)
+
+        code, out, _ = self.run_main(["--no-cache", "a", "b"], handler)
+
+        self.assertEqual(code, "github: rate limit exceeded")
+        owner_a = sorted(line for line in out if line.startswith("a/"))
+        self.assertEqual(owner_a, [f"a/a-{page}" for page in range(1, 5)])
+
+    def test_unexpected_error_is_not_swallowed(self):
+        def handler(request):
+            owner = request.url.path.split("/")[2]
+            if owner == "b":
+                return httpx.Response(200, text="<html>not json</html>")
+            return repos_page(owner, page_of(request), 1)
+
+        for argv in (["--no-cache", "b"], ["--no-cache", "a", "b"]):
+            with self.subTest(argv=argv), self.assertRaises(ValueError):
+                self.run_main(argv, handler)
+
+
+def page_of(request):
+    return int(request.url.params.get("page", "1"))
+
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())